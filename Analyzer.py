@@ -7,11 +7,24 @@ to support modernization decisions.
 
 import re
 import ast
+import io
+import os
+import sys
 import json
+import pickle
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple, Union
 from enum import Enum
 
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used instead
+    orjson = None
+
 
 # ---------------- ENUMS ----------------
 
@@ -31,113 +44,419 @@ class Severity(Enum):
 
 # ---------------- DATA MODELS ----------------
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AntiPattern:
     name: str
     severity: str
     description: str
     line_number: int
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "severity": self.severity,
+            "description": self.description,
+            "line_number": self.line_number
+        }
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CodeSmell:
     name: str
     location: str
     description: str
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "location": self.location,
+            "description": self.description
+        }
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CodeMetrics:
     lines_of_code: int
+    comment_lines: int
+    blank_lines: int
     cyclomatic_complexity: int
     class_count: int
     function_count: int
+    avg_function_length: float
     maintainability_index: float
     technical_debt_score: float
     python_version: str
-    anti_patterns: List[AntiPattern]
-    code_smells: List[CodeSmell]
+    # Tuples, so instances held by the caches cannot be modified through
+    # anything analyze() hands back.
+    dependencies: Tuple[str, ...]
+    anti_patterns: Tuple[AntiPattern, ...]
+    code_smells: Tuple[CodeSmell, ...]
+
+
+class LineStats(NamedTuple):
+    line_count: int
+    comment_lines: int
+    blank_lines: int
+    long_line_smells: List[CodeSmell]
+    deep_nest_smells: List[CodeSmell]
+    commented_code_count: int
+
+
+# ---------------- PATTERNS ----------------
+
+# Any single hit marks the source as legacy, so one search() both scans
+# every Python 2 marker in a single pass and stops at the first match.
+_PY2_SYNTAX_RE = re.compile(r'print\s+[^(]|\bxrange\b|\.iter(?:items|keys|values)\(\)')
+# Every _PY2_SYNTAX_RE match contains one of these literals; checking them
+# with `in` first skips the regex engine entirely on clean sources.
+_PY2_KEYWORDS = ("print", "xrange", ".iter")
+
+_CODELIKE_CHARS = re.compile(r'[({\[=;]')
+
+# Line separators recognised by str.splitlines() beyond \n, \r\n and \r.
+_EXTRA_LINE_BREAKS = re.compile(r'[\v\f\x1c-\x1e\x85\u2028\u2029]')
+
+_SEV_CRITICAL, _SEV_HIGH, _SEV_MEDIUM, _SEV_LOW = (
+    s.value for s in (Severity.CRITICAL, Severity.HIGH, Severity.MEDIUM, Severity.LOW)
+)
+
+# Severities are stored as their string values so flagging a finding does
+# not go through the Enum descriptor each time.
+_ANTI_PATTERNS = {
+    "eval": ("Dangerous eval usage", _SEV_CRITICAL,
+             "eval() can execute arbitrary code"),
+    "exec": ("Dangerous exec usage", _SEV_CRITICAL,
+             "exec() can execute arbitrary code"),
+    "bare_except": ("Bare except", _SEV_MEDIUM,
+                    "Catches every exception, including SystemExit and KeyboardInterrupt"),
+    "star_import": ("Wildcard import", _SEV_MEDIUM,
+                    "from module import * pollutes the namespace"),
+    "mutable_default": ("Mutable default argument", _SEV_HIGH,
+                        "Default list/dict is shared across calls"),
+    "global_stmt": ("Global state", _SEV_LOW,
+                    "global statements make data flow hard to follow"),
+    "py2_api": ("Legacy Python 2 API", _SEV_HIGH,
+                "xrange/iter* helpers do not exist in Python 3"),
+}
+
+# Technical-debt points per finding. eval() keeps the flat 20 it always
+# carried; lesser findings must not weigh as much.
+_DEBT_WEIGHTS = {_SEV_CRITICAL: 20, _SEV_HIGH: 10, _SEV_MEDIUM: 5, _SEV_LOW: 2}
 
 
 # ---------------- AST COMPLEXITY ----------------
 
-class ComplexityVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.complexity = 1
+_DANGEROUS_CALLS = {"eval", "exec"}
+_PY2_CALLS = {"xrange"}
+_PY2_METHODS = {"iteritems", "iterkeys", "itervalues"}
 
-    def visit_If(self, node):
-        self.complexity += 1
-        self.generic_visit(node)
 
-    def visit_For(self, node):
-        self.complexity += 1
-        self.generic_visit(node)
+class AstFacts(NamedTuple):
+    complexity: int
+    class_count: int
+    function_count: int
+    function_spans: List[tuple]
+    dependencies: List[str]
+    anti_patterns: List[AntiPattern]
 
-    def visit_While(self, node):
-        self.complexity += 1
-        self.generic_visit(node)
+
+def _analyze_ast(tree: ast.Module) -> AstFacts:
+    """Collect complexity, definition counts and anti-patterns in one walk.
+
+    Dispatch compares node types by identity instead of going through
+    NodeVisitor's per-node method lookup.
+    """
+    complexity = 1
+    class_count = 0
+    function_count = 0
+    function_spans = []
+    dependencies = set()
+    anti_patterns = []
+
+    def flag(kind, node):
+        name, severity, description = _ANTI_PATTERNS[kind]
+        anti_patterns.append(AntiPattern(name, severity, description, node.lineno))
+
+    for node in ast.walk(tree):
+        t = type(node)
+        if t is ast.Call:
+            func = node.func
+            if type(func) is ast.Name:
+                if func.id in _DANGEROUS_CALLS:
+                    flag(func.id, node)
+                elif func.id in _PY2_CALLS:
+                    flag("py2_api", node)
+            elif (
+                type(func) is ast.Attribute
+                and func.attr in _PY2_METHODS
+                # d.iteritems() only; six.iteritems(d) is the Python 3 shim.
+                and not node.args
+                and not (type(func.value) is ast.Name and func.value.id == "six")
+            ):
+                flag("py2_api", node)
+        elif t is ast.If or t is ast.For or t is ast.While:
+            complexity += 1
+        elif t is ast.FunctionDef or t is ast.AsyncFunctionDef:
+            function_count += 1
+            function_spans.append((node.name, node.end_lineno - node.lineno + 1))
+            defaults = node.args.defaults + node.args.kw_defaults
+            if any(type(d) is ast.List or type(d) is ast.Dict for d in defaults):
+                flag("mutable_default", node)
+        elif t is ast.ClassDef:
+            class_count += 1
+        elif t is ast.ExceptHandler:
+            if node.type is None:
+                flag("bare_except", node)
+        elif t is ast.Import:
+            for alias in node.names:
+                dependencies.add(alias.name.split(".")[0])
+        elif t is ast.ImportFrom:
+            # Relative imports refer to the analyzed package itself.
+            if node.module and not node.level:
+                dependencies.add(node.module.split(".")[0])
+            if any(alias.name == "*" for alias in node.names):
+                flag("star_import", node)
+        elif t is ast.Global:
+            flag("global_stmt", node)
+
+    # ast.walk is breadth-first; report findings in source order.
+    anti_patterns.sort(key=lambda ap: ap.line_number)
+
+    return AstFacts(
+        complexity, class_count, function_count, function_spans,
+        sorted(dependencies), anti_patterns
+    )
+
+
+# ---------------- CACHE ----------------
+
+def _code_hash(code_bytes: bytes, is_text: bool) -> bytes:
+    # Text and raw bytes with identical UTF-8 content can still parse
+    # differently (a coding cookie only applies to bytes), so keep them apart.
+    person = b"str" if is_text else b"bytes"
+    return hashlib.blake2b(code_bytes, digest_size=16, person=person).digest()
+
+
+def _parse(source: Union[str, bytes]) -> ast.Module:
+    return compile(source, "<analyzer>", "exec", flags=ast.PyCF_ONLY_AST)
+
+
+# In-memory LRU of CodeMetrics keyed on the digest alone, so a lookup never
+# hashes or compares the full source and no source text is kept alive.
+_METRICS_CACHE_SIZE = 128
+_metrics_cache: "OrderedDict[bytes, CodeMetrics]" = OrderedDict()
+_metrics_cache_lock = threading.Lock()
+_metrics_cache_stats = {"hits": 0, "misses": 0}
+
+
+# Opt-in persistent cache (CODEANALYZER_CACHE=1). It lives under the user's
+# cache directory rather than the shared temp dir because entries are pickles.
+# Bump _DISK_CACHE_VERSION whenever CodeMetrics changes shape.
+_DISK_CACHE_VERSION = 7
+
+
+def _disk_cache_enabled() -> bool:
+    return os.environ.get("CODEANALYZER_CACHE") == "1"
+
+
+def _disk_cache_dir() -> Path:
+    # Resolved on use: Path.home() raises without a resolvable home
+    # directory, which must not break importing the module.
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "codeanalyzer" / f"v{_DISK_CACHE_VERSION}"
+
+
+def _load_cached_metrics(path: Path) -> Optional[CodeMetrics]:
+    try:
+        with open(path, "rb") as f:
+            metrics = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+        # Missing, truncated or written by an older layout: recompute.
+        return None
+    # Anything else found in the cache directory is ignored, not returned.
+    return metrics if isinstance(metrics, CodeMetrics) else None
+
+
+def _store_cached_metrics(path: Path, metrics: CodeMetrics) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(metrics, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+
+
+def cache_info() -> Dict[str, Any]:
+    """Hit/miss statistics for the in-memory metrics cache."""
+    with _metrics_cache_lock:
+        return {
+            "hits": _metrics_cache_stats["hits"],
+            "misses": _metrics_cache_stats["misses"],
+            "maxsize": _METRICS_CACHE_SIZE,
+            "currsize": len(_metrics_cache),
+        }
 
 
 # ---------------- ANALYZER ----------------
 
 class CodeAnalyzer:
-    def __init__(self, code: str):
-        self.code = code
+    def __init__(self, code: Union[str, bytes]):
+        # Bytes feed hashing directly; the text form feeds the line and regex
+        # scans. Parsing uses whatever the caller passed: compiling bytes
+        # honours a PEP 263 coding cookie, which must not be re-applied to
+        # text that is already decoded.
+        self._source = code
+        if isinstance(code, bytes):
+            self._code_bytes = code
+            self.code = code.decode("utf-8", "replace")
+        else:
+            self._code_bytes = code.encode("utf-8")
+            self.code = code
+
+    def _iter_lines(self):
+        # Line boundaries must match str.splitlines() (which also breaks on
+        # \f, \v, \x1c-\x1e, \x85, \u2028 and \u2029) so lines_of_code is
+        # unchanged. Universal-newline StringIO would only split on \n, \r\n
+        # and \r, so only use it when none of the other separators occur.
+        if _EXTRA_LINE_BREAKS.search(self.code) is None:
+            for line in io.StringIO(self.code, newline=None):
+                yield line.rstrip("\n")
+        else:
+            yield from self.code.splitlines()
 
     def analyze(self) -> Dict[str, Any]:
-        tree = ast.parse(self.code)
-        visitor = ComplexityVisitor()
-        visitor.visit(tree)
-
-        loc = len(self.code.splitlines())
-        classes = len(re.findall(r'^class ', self.code, re.MULTILINE))
-        functions = len(re.findall(r'^def ', self.code, re.MULTILINE))
-
-        python_version = "Python 2 (Legacy)" if re.search(r'print\s+[^(]', self.code) else "Python 3"
-
-        anti_patterns = []
-        if "eval(" in self.code:
-            anti_patterns.append(
-                AntiPattern(
-                    "Dangerous eval usage",
-                    Severity.CRITICAL.value,
-                    "eval() can execute arbitrary code",
-                    0
-                )
-            )
+        metrics = _cached_metrics(
+            _code_hash(self._code_bytes, isinstance(self._source, str)), self
+        )
+
+        result = {
+            "risk_level": self._calculate_risk(metrics.technical_debt_score),
+            "metrics": {
+                "lines_of_code": metrics.lines_of_code,
+                "comment_lines": metrics.comment_lines,
+                "blank_lines": metrics.blank_lines,
+                "cyclomatic_complexity": metrics.cyclomatic_complexity,
+                "class_count": metrics.class_count,
+                "function_count": metrics.function_count,
+                "avg_function_length": metrics.avg_function_length,
+                "maintainability_index": metrics.maintainability_index,
+                "technical_debt_score": metrics.technical_debt_score,
+                "python_version": metrics.python_version
+            },
+            "dependencies": list(metrics.dependencies),
+            "anti_patterns": [ap.to_dict() for ap in metrics.anti_patterns],
+            "code_smells": [cs.to_dict() for cs in metrics.code_smells]
+        }
+
+        return result
+
+    def _compute_metrics(self) -> CodeMetrics:
+        tree = _parse(self._source)
+        facts = _analyze_ast(tree)
+
+        line_stats = self._classify_lines()
+        loc = line_stats.line_count
+
+        spans = facts.function_spans
+        avg_function_length = round(sum(length for _, length in spans) / len(spans), 2) if spans else 0
+
+        python_version = self._detect_python_version()
+
+        anti_patterns = facts.anti_patterns
 
         code_smells = []
-        if visitor.complexity > 15:
+        if facts.complexity > 15:
             code_smells.append(
                 CodeSmell(
                     "High Complexity",
                     "Module",
-                    f"Complexity score is {visitor.complexity}"
+                    f"Complexity score is {facts.complexity}"
+                )
+            )
+        for name, length in spans:
+            if length > 50:
+                code_smells.append(
+                    CodeSmell(
+                        "Long Function",
+                        f"Function '{name}'",
+                        f"{length} lines (limit 50)"
+                    )
+                )
+        code_smells.extend(line_stats.long_line_smells)
+        code_smells.extend(line_stats.deep_nest_smells)
+        if line_stats.commented_code_count:
+            code_smells.append(
+                CodeSmell(
+                    "Commented-Out Code",
+                    "Module",
+                    f"{line_stats.commented_code_count} comment lines look like code"
                 )
             )
 
-        maintainability = max(0, 100 - visitor.complexity * 4)
-        tech_debt = min(100, visitor.complexity * 5 + len(anti_patterns) * 20)
-
-        result = {
-            "risk_level": self._calculate_risk(tech_debt),
-            "metrics": {
-                "lines_of_code": loc,
-                "cyclomatic_complexity": visitor.complexity,
-                "class_count": classes,
-                "function_count": functions,
-                "maintainability_index": maintainability,
-                "technical_debt_score": tech_debt,
-                "python_version": python_version
-            },
-            "anti_patterns": [ap.__dict__ for ap in anti_patterns],
-            "code_smells": [cs.__dict__ for cs in code_smells]
-        }
+        maintainability = max(0, 100 - facts.complexity * 4)
+        tech_debt = min(
+            100, facts.complexity * 5 + sum(_DEBT_WEIGHTS[ap.severity] for ap in anti_patterns)
+        )
+
+        return CodeMetrics(
+            lines_of_code=loc,
+            comment_lines=line_stats.comment_lines,
+            blank_lines=line_stats.blank_lines,
+            cyclomatic_complexity=facts.complexity,
+            class_count=facts.class_count,
+            function_count=facts.function_count,
+            avg_function_length=avg_function_length,
+            maintainability_index=maintainability,
+            technical_debt_score=tech_debt,
+            python_version=python_version,
+            dependencies=tuple(facts.dependencies),
+            anti_patterns=tuple(anti_patterns),
+            code_smells=tuple(code_smells)
+        )
+
+    def _detect_python_version(self) -> str:
+        code = self.code
+        if any(k in code for k in _PY2_KEYWORDS) and _PY2_SYNTAX_RE.search(code):
+            return "Python 2 (Legacy)"
+        return "Python 3"
+
+    def _classify_lines(self) -> LineStats:
+        """Collect every per-line signal in a single pass over the source."""
+        line_count = 0
+        comment_lines = 0
+        blank_lines = 0
+        long_line_smells = []
+        deep_nest_smells = []
+        commented_code = 0
+
+        for line_count, line in enumerate(self._iter_lines(), 1):
+            stripped = line.strip()
+            if not stripped:
+                blank_lines += 1
+                continue
+
+            if stripped[0] == "#":
+                comment_lines += 1
+                if _CODELIKE_CHARS.search(line) is not None:
+                    commented_code += 1
+
+            width = len(line)
+            if width > 120:
+                long_line_smells.append(
+                    CodeSmell("Long Line", f"Line {line_count}", f"{width} characters (limit 120)")
+                )
 
-        with open("analysis_report.json", "w") as f:
-            json.dump(result, f, indent=2)
+            # Everything before the first non-blank character is indentation,
+            # so reuse `stripped` instead of allocating line.lstrip().
+            indent = line.find(stripped[0])
+            if indent > 20:
+                deep_nest_smells.append(
+                    CodeSmell("Deep Nesting", f"Line {line_count}", f"Indented {indent} spaces")
+                )
 
-        return result
+        return LineStats(
+            line_count, comment_lines, blank_lines, long_line_smells, deep_nest_smells, commented_code
+        )
 
     def _calculate_risk(self, debt):
         if debt > 70:
@@ -149,6 +468,84 @@ class CodeAnalyzer:
         return RiskLevel.LOW.value
 
 
+def _cached_metrics(code_hash: bytes, analyzer: CodeAnalyzer) -> CodeMetrics:
+    with _metrics_cache_lock:
+        metrics = _metrics_cache.get(code_hash)
+        if metrics is not None:
+            _metrics_cache.move_to_end(code_hash)
+            _metrics_cache_stats["hits"] += 1
+            return metrics
+        _metrics_cache_stats["misses"] += 1
+
+    if _disk_cache_enabled():
+        path = _disk_cache_dir() / f"{code_hash.hex()}.pickle"
+        metrics = _load_cached_metrics(path)
+        if metrics is None:
+            metrics = analyzer._compute_metrics()
+            _store_cached_metrics(path, metrics)
+    else:
+        metrics = analyzer._compute_metrics()
+
+    with _metrics_cache_lock:
+        _metrics_cache[code_hash] = metrics
+        if len(_metrics_cache) > _METRICS_CACHE_SIZE:
+            _metrics_cache.popitem(last=False)
+    return metrics
+
+
+def save_report(result: Dict[str, Any], path: str = "analysis_report.json", indent: Optional[int] = None) -> None:
+    """Write an analyze() result to disk; compact unless indent is given."""
+    # orjson only knows compact and 2-space output; other widths use json.
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_INDENT_2 if indent else 0
+        Path(path).write_bytes(orjson.dumps(result, option=option))
+        return
+
+    separators = None if indent else (",", ":")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=indent, separators=separators)
+
+
+_SEVERITY_ICON = {"critical": "🔴", "high": "🟠", "medium": "🟡", "low": "⚪"}
+_RULE80 = "=" * 80
+_SEP80 = "-" * 80
+
+
+def print_analysis_report(result: Dict[str, Any]) -> None:
+    """Render an analyze() result; the whole report goes out in one write."""
+    buf = [
+        _RULE80,
+        "CODE ANALYSIS REPORT",
+        _RULE80,
+        f"Risk level: {result['risk_level'].upper()}",
+        "",
+        "Metrics",
+        _SEP80,
+    ]
+    for key, value in result["metrics"].items():
+        buf.append(f"  {key.replace('_', ' ').capitalize()}: {value}")
+
+    buf.append("")
+    buf.append(f"Dependencies: {', '.join(result['dependencies']) or 'none'}")
+
+    buf.append("")
+    buf.append(f"Anti-patterns ({len(result['anti_patterns'])})")
+    buf.append(_SEP80)
+    for ap in result["anti_patterns"]:
+        icon = _SEVERITY_ICON.get(ap["severity"], "⚪")
+        buf.append(f"  {icon} [{ap['severity']}] {ap['name']} (line {ap['line_number']}): {ap['description']}")
+
+    buf.append("")
+    buf.append(f"Code smells ({len(result['code_smells'])})")
+    buf.append(_SEP80)
+    for cs in result["code_smells"]:
+        buf.append(f"  - {cs['name']} @ {cs['location']}: {cs['description']}")
+
+    buf.append("")
+    sys.stdout.write("\n".join(buf))
+    sys.stdout.flush()
+
+
 # ---------------- RUN ----------------
 
 if __name__ == "__main__":
@@ -156,8 +553,10 @@ if __name__ == "__main__":
 def calculate(x, y):
     return eval("x + y")
 
-print "hello"
+for i in xrange(3):
+    print(calculate(i, i))
 """
     analyzer = CodeAnalyzer(sample_code)
     report = analyzer.analyze()
-    print("Analysis complete. Risk:", report["risk_level"])
+    save_report(report, indent=2)
+    print_analysis_report(report)
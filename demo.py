@@ -1,12 +1,25 @@
+import functools
+
 from rag_engine import SimpleRAG
 
-rag = SimpleRAG("knowledge_base.txt")
 
-print("Code Modernization RAG Assistant")
-print("Type 'exit' to quit\n")
+@functools.lru_cache(maxsize=None)
+def get_rag(knowledge_file="knowledge_base.txt"):
+    return SimpleRAG(knowledge_file)
+
+
+def main():
+    rag = get_rag()
+
+    print("Code Modernization RAG Assistant")
+    print("Type 'exit' to quit\n")
+
+    while True:
+        q = input("Ask: ")
+        if q.lower() == "exit":
+            break
+        print("Answer:", rag.answer(q))
+
 
-while True:
-    q = input("Ask: ")
-    if q.lower() == "exit":
-        break
-    print("Answer:", rag.answer(q))
+if __name__ == "__main__":
+    main()
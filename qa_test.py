@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from rag_engine import SimpleRAG
 
 rag = SimpleRAG("knowledge_base.txt")
@@ -19,9 +21,13 @@ tests = [
 
 passed = 0
 
-for test in tests:
-    answer = rag.answer(test["question"]).lower()
-    if test["expected_keyword"] in answer:
+with ThreadPoolExecutor() as executor:
+    answers = list(executor.map(lambda t: rag.answer(t["question"]).lower(), tests))
+
+expected = [t["expected_keyword"].lower() for t in tests]
+
+for test, keyword, answer in zip(tests, expected, answers):
+    if keyword in answer:
         passed += 1
         print(f"PASS: {test['question']}")
     else:
@@ -1,36 +1,257 @@
+import os
 import re
+import mmap
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # optional, retrieval falls back to set intersection
+    np = None
+
+try:
+    from numba import njit
+except ImportError:  # optional, the NumPy path is used without it
+    njit = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional, only exact-match answer caching is used
+    SentenceTransformer = None
+
+__all__ = ["SimpleRAG"]
+
+_NUMBA_AVAILABLE = np is not None and njit is not None
+
+_ANSWER_CACHE_SIZE = 1024
+
+_SEMANTIC_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+_SEMANTIC_THRESHOLD = 0.92
+_SEMANTIC_CACHE_SIZE = 256
+
+# Response templates keyed by intent, in priority order: when a query names
+# several keywords, the earliest rule wins.
+_INTENT_TEMPLATES = {
+    "risk": "The code is risky because: {context}",
+    "modernize": "Recommended modernization steps: {context}",
+}
+_DEFAULT_TEMPLATE = "Relevant information: {context}"
+_INTENT_PRIORITY = {keyword: rank for rank, keyword in enumerate(_INTENT_TEMPLATES)}
+# answer() already lowercases the query for its cache key, so a plain,
+# case-sensitive alternation is enough and every hit is a priority key.
+_INTENT_RE = re.compile("|".join(map(re.escape, _INTENT_TEMPLATES)))
+
+# Words are runs of letters/digits, so "debt?" and "eval()" match "debt"
+# and "eval"; one findall replaces the split and any punctuation stripping.
+_TOKEN_RE = re.compile(r"\w+")
+
+# Below this many documents the plain set loop beats the array setup cost.
+_VECTORIZE_MIN_DOCS = 256
+
+
+def _tokenize(text):
+    return frozenset(_TOKEN_RE.findall(text.lower()))
+
+
+def _read_lines(path):
+    # Lines come straight off the mapped pages, so the whole file is never
+    # held as one decoded string (or a list of them) during loading.
+    with open(path, "rb") as f:
+        fd = f.fileno()
+        if os.fstat(fd).st_size == 0:
+            return  # mmap rejects empty files
+        if hasattr(os, "posix_fadvise"):  # not available on Windows
+            # Let the kernel start reading ahead while the mapping is set up.
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            for raw in iter(mm.readline, b""):
+                yield raw.decode("utf-8")
+
+
+if _NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _best_doc_jit(query_ids, indptr, postings, n_docs):
+        # Same result as bincount + argmax over the query's postings, but in
+        # one compiled loop with no concatenated temporary.
+        scores = np.zeros(n_docs, np.int32)
+        for t in query_ids:
+            for k in range(indptr[t], indptr[t + 1]):
+                scores[postings[k]] += 1
+
+        best, best_score = -1, 0
+        for d in range(n_docs):
+            if scores[d] > best_score:
+                best, best_score = d, scores[d]
+        return best
+
 
 class SimpleRAG:
-    def __init__(self, knowledge_file):
-        with open(knowledge_file, "r") as f:
-            self.documents = [
-                line.strip()
-                for line in f.readlines()
-                if line.strip()
-            ]
+    def __init__(self, knowledge_file, semantic_cache=False):
+        self.documents = []
+        self.doc_tokens = []
+        for line in _read_lines(knowledge_file):
+            doc = line.strip()
+            if doc:
+                self.documents.append(doc)
+                self.doc_tokens.append(_tokenize(doc))
+
+        self._answer_cache = OrderedDict()
+        # Retrieval is read-only; only the caches need guarding when answer()
+        # is called from several threads.
+        self._cache_lock = threading.Lock()
+
+        # Opt-in paraphrase cache: unit-normalized query embeddings, one row
+        # per entry, with the (intent, answer) pair each row was computed for.
+        self._encoder = None
+        if semantic_cache and SentenceTransformer is not None and np is not None:
+            self._encoder = SentenceTransformer(_SEMANTIC_MODEL)
+            self._emb_matrix = None
+            self._emb_entries = []
+
+        self.vocab = None
+        if np is not None and len(self.documents) >= _VECTORIZE_MIN_DOCS:
+            self._build_postings()
+
+    def _build_postings(self):
+        # Term-major CSR: documents containing vocab term i are
+        # postings[indptr[i]:indptr[i + 1]]. Unlike a dense term x doc
+        # matrix, memory grows with the number of (term, doc) pairs only.
+        term_docs = {}
+        for doc_id, doc_words in enumerate(self.doc_tokens):
+            for word in doc_words:
+                term_docs.setdefault(word, []).append(doc_id)
+
+        self.vocab = {word: i for i, word in enumerate(term_docs)}
+        lengths = [len(ids) for ids in term_docs.values()]
+        self.indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.postings = np.fromiter(
+            (doc_id for ids in term_docs.values() for doc_id in ids),
+            dtype=np.int32,
+            count=int(self.indptr[-1]),
+        )
+
+        if _NUMBA_AVAILABLE:
+            # Compile (or load the cached build) now, not on the first query.
+            _best_doc_jit(np.zeros(0, np.int64), self.indptr, self.postings, len(self.documents))
+
+    def _retrieve_vectorized(self, query_words):
+        ids = [self.vocab[w] for w in query_words if w in self.vocab]
+        if not ids:
+            return None
+
+        if _NUMBA_AVAILABLE:
+            best = _best_doc_jit(
+                np.array(ids, dtype=np.int64), self.indptr, self.postings, len(self.documents)
+            )
+            return self.documents[best] if best >= 0 else None
+
+        hits = np.concatenate([
+            self.postings[self.indptr[i]:self.indptr[i + 1]] for i in ids
+        ])
+        scores = np.bincount(hits, minlength=len(self.documents))
+        best = int(np.argmax(scores))
+        return self.documents[best] if scores[best] > 0 else None
 
     def retrieve(self, query):
-        query_words = set(query.lower().split())
-        scored_docs = []
+        query_words = _tokenize(query)
+        if self.vocab is not None:
+            return self._retrieve_vectorized(query_words)
+
+        max_score = len(query_words)
+        best_score, best_doc = 0, None
 
-        for doc in self.documents:
-            doc_words = set(doc.lower().split())
+        for doc, doc_words in zip(self.documents, self.doc_tokens):
             score = len(query_words & doc_words)
-            scored_docs.append((score, doc))
+            if score > best_score:
+                best_score, best_doc = score, doc
+                # No later document can contain more than every query word.
+                if score == max_score:
+                    break
 
-        scored_docs.sort(reverse=True)
-        return scored_docs[0][1] if scored_docs else None
+        return best_doc
 
     def answer(self, query):
+        # Answers depend only on the lowercased words of the query.
+        key = query.strip().lower()
+        with self._cache_lock:
+            cached = self._answer_cache.get(key)
+            if cached is not None:
+                self._answer_cache.move_to_end(key)
+                return cached
+
+        if self._encoder is not None:
+            response = self._semantic_answer(key)
+        else:
+            response = self._answer(key)
+
+        with self._cache_lock:
+            self._answer_cache[key] = response
+            if len(self._answer_cache) > _ANSWER_CACHE_SIZE:
+                self._answer_cache.popitem(last=False)
+        return response
+
+    def _semantic_answer(self, query):
+        # Encoding and retrieval run unlocked; only the embedding matrix and
+        # its entries are shared state.
+        intent = self._intent(query)
+        emb = self._encoder.encode(query, normalize_embeddings=True)
+
+        with self._cache_lock:
+            cached = self._emb_lookup(emb, intent)
+        if cached is not None:
+            return cached
+
+        response = self._answer(query)
+        with self._cache_lock:
+            self._emb_insert(emb, intent, response)
+        return response
+
+    def _emb_lookup(self, emb, intent):
+        if self._emb_matrix is None:
+            return None
+
+        sims = self._emb_matrix @ emb
+        best = int(np.argmax(sims))
+        cached_intent, cached = self._emb_entries[best]
+        # A paraphrase must also hit the same template, otherwise e.g. a
+        # risk question could be served a modernization answer.
+        if sims[best] > _SEMANTIC_THRESHOLD and cached_intent == intent:
+            self._emb_touch(best)
+            return cached
+        return None
+
+    def _emb_insert(self, emb, intent, response):
+        row = emb[np.newaxis, :]
+        if self._emb_matrix is None:
+            self._emb_matrix = row
+        else:
+            self._emb_matrix = np.vstack((self._emb_matrix[-(_SEMANTIC_CACHE_SIZE - 1):], row))
+            self._emb_entries = self._emb_entries[-(_SEMANTIC_CACHE_SIZE - 1):]
+        self._emb_entries.append((intent, response))
+
+    def _emb_touch(self, i):
+        # Rows run least to most recently used, and eviction drops the
+        # front, so a hit moves its row to the end (LRU, not FIFO).
+        last = len(self._emb_entries) - 1
+        if i == last:
+            return
+        order = np.r_[0:i, i + 1:last + 1, i]
+        self._emb_matrix = self._emb_matrix[order]
+        self._emb_entries.append(self._emb_entries.pop(i))
+
+    def _intent(self, query):
+        # `query` is the lowercased cache key; lowering it again would copy it.
+        hits = _INTENT_RE.findall(query)
+        if not hits:
+            return None
+        return min(hits, key=_INTENT_PRIORITY.__getitem__)
+
+    def _answer(self, query):
         context = self.retrieve(query)
 
         if not context:
             return "No relevant information found."
 
-        if "risk" in query.lower():
-            return f"The code is risky because: {context}"
-
-        if "modernize" in query.lower():
-            return f"Recommended modernization steps: {context}"
-
-        return f"Relevant information: {context}"
+        template = _INTENT_TEMPLATES.get(self._intent(query), _DEFAULT_TEMPLATE)
+        return template.format(context=context)